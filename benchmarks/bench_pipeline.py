@@ -0,0 +1,234 @@
+"""End-to-end pipeline benchmark
+
+Drives the email validation API (through the Flask test client) and the
+EmailProcessor against in-process SSM/SQS/S3 fakes with injected latency, and
+reports API latency, throughput, AWS calls per message and peak RSS as JSON.
+
+Usage:
+    python benchmarks/bench_pipeline.py --requests 2000 --concurrency 8 \
+        --sqs-latency-ms 5 --s3-latency-ms 15 --output bench.json
+
+    # Fail (exit 1) when a metric regresses more than 20% against a saved run
+    python benchmarks/bench_pipeline.py --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import harness
+
+# Metrics compared against --baseline, and whether higher values are better
+REGRESSION_METRICS = {
+    ('api', 'latency', 'p50_ms'): False,
+    ('api', 'latency', 'p99_ms'): False,
+    ('api', 'requests_per_second'): True,
+    ('processor', 'messages_per_second'): True,
+    ('processor', 'aws_calls_per_message'): False,
+    ('api', 'aws_calls_per_request'): False,
+}
+
+
+def build_payloads(count: int, senders: int, seed: int) -> List[Dict]:
+    """Generate request bodies with a skewed sender mix and varied content sizes"""
+    rng = random.Random(seed)
+    sender_names = [f"sender{index}@example.com" for index in range(senders)]
+    # Zipf-like weights so a handful of senders dominate, as in real traffic
+    weights = [1.0 / (rank + 1) for rank in range(senders)]
+    payloads = []
+    for index in range(count):
+        content_length = int(rng.lognormvariate(7, 0.8))
+        payloads.append({
+            'data': {
+                'email_subject': f"Benchmark message {index}",
+                'email_sender': rng.choices(sender_names, weights)[0],
+                'email_timestream': str(1693561101 + index),
+                'email_content': ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz ', k=min(content_length, 64 * 1024))),
+            },
+            'token': harness.AUTH_TOKEN,
+        })
+    return payloads
+
+
+def run_api_phase(validation_app, aws, payloads: List[Dict], concurrency: int) -> Dict:
+    """POST every payload to /validate-email and measure per-request latency"""
+    flask_app = validation_app.app
+    local = threading.local()
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def send(payload):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = flask_app.test_client()
+        started = time.perf_counter()
+        response = client.post('/validate-email', json=payload)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code != 200:
+                failures.append(response.status_code)
+
+    aws.reset_calls()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, payloads))
+    wall = time.perf_counter() - started
+    calls = dict(aws.calls)
+
+    return {
+        'requests': len(payloads),
+        'failures': len(failures),
+        'concurrency': concurrency,
+        'wall_seconds': round(wall, 4),
+        'requests_per_second': round(len(payloads) / wall, 2) if wall else 0.0,
+        'latency': harness.latency_summary_ms(latencies),
+        'aws_calls': calls,
+        'aws_calls_per_request': round(sum(calls.values()) / len(payloads), 3) if payloads else 0.0,
+    }
+
+
+def run_processor_phase(processor_app, aws, expected: int) -> Dict:
+    """Drain the queue with a single EmailProcessor, skipping the loop's idle sleeps"""
+    processor = processor_app.EmailProcessor()
+    queue_depths = processor._collect_shard_depths()
+
+    aws.reset_calls()
+    processed = 0
+    errors = 0
+    polls = 0
+    started = time.perf_counter()
+    while any(queue.visible for queue in aws.queues.values()):
+        polls += 1
+        for queue_url, messages, received_at in processor._poll_cycle():
+            batch_success, batch_errors = processor._process_batch(messages, queue_url, received_at)
+            processed += batch_success
+            errors += batch_errors
+    wall = time.perf_counter() - started
+    calls = dict(aws.calls)
+
+    return {
+        'expected': expected,
+        'processed': processed,
+        'errors': errors,
+        'poll_cycles': polls,
+        'queue_depths_before_drain': queue_depths,
+        'wall_seconds': round(wall, 4),
+        'messages_per_second': round(processed / wall, 2) if wall else 0.0,
+        'aws_calls': calls,
+        'aws_calls_per_message': round(sum(calls.values()) / processed, 3) if processed else 0.0,
+        'objects_in_bucket': sum(1 for key in aws.buckets[harness.BUCKET_NAME] if key.startswith('emails/')),
+        'delivery_latency': processor.delivery_metrics.summary(),
+        'pipeline_stages': processor.pipeline.summary(),
+    }
+
+
+def _lookup(results: Dict, path):
+    for key in path:
+        results = results[key]
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond the tolerance"""
+    regressions = []
+    for path, higher_is_better in REGRESSION_METRICS.items():
+        try:
+            current = _lookup(results, path)
+            previous = _lookup(baseline, path)
+        except KeyError:
+            continue
+        if not previous:
+            continue
+        change = (current - previous) / previous
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{'.'.join(path)}: {previous} -> {current} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='Number of API requests to send')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent API client threads')
+    parser.add_argument('--senders', type=int, default=50, help='Distinct email senders in the generated load')
+    parser.add_argument('--shards', type=int, default=0, help='Sender-sharded queues (0 uses the single shared queue)')
+    parser.add_argument('--pipeline', default='parse,validate,s3', help='PROCESSOR_PIPELINE stage list')
+    parser.add_argument('--archive-format', default='compact', help='ARCHIVE_FORMAT for the processor (compact or pretty)')
+    parser.add_argument('--max-messages', type=int, default=10, help='MAX_MESSAGES_PER_POLL for the processor')
+    parser.add_argument('--ssm-latency-ms', type=float, default=2.0, help='Injected latency per SSM call')
+    parser.add_argument('--sqs-latency-ms', type=float, default=5.0, help='Injected latency per SQS call')
+    parser.add_argument('--s3-latency-ms', type=float, default=10.0, help='Injected latency per S3 call')
+    parser.add_argument('--seed', type=int, default=1234, help='Seed for payload generation')
+    parser.add_argument('--log-level', default='WARNING', help='LOG_LEVEL for both services')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    parser.add_argument('--baseline', help='Previous results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression vs --baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    harness.configure_environment(args.log_level, args.shards)
+    os.environ['MAX_MESSAGES_PER_POLL'] = str(args.max_messages)
+    os.environ['PROCESSOR_PIPELINE'] = args.pipeline
+    os.environ['ARCHIVE_FORMAT'] = args.archive_format
+    # The fake queues always return every visible message, so sharded runs can
+    # skip the per-queue long poll wait that real SQS needs
+    os.environ.setdefault('SHARD_POLL_WAIT_SECONDS', '0')
+
+    latency = {
+        'ssm': args.ssm_latency_ms / 1000.0,
+        'sqs': args.sqs_latency_ms / 1000.0,
+        's3': args.s3_latency_ms / 1000.0,
+    }
+    aws = harness.build_fake_aws(latency, args.shards)
+    validation_app = harness.load_service('email-validation', aws)
+    processor_app = harness.load_service('email-processor', aws)
+
+    payloads = build_payloads(args.requests, args.senders, args.seed)
+    api_results = run_api_phase(validation_app, aws, payloads, args.concurrency)
+    processor_results = run_processor_phase(processor_app, aws, args.requests - api_results['failures'])
+
+    results = {
+        'config': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'senders': args.senders,
+            'shards': args.shards,
+            'max_messages_per_poll': args.max_messages,
+            'pipeline': args.pipeline,
+            'archive_format': args.archive_format,
+            'injected_latency_ms': {
+                'ssm': args.ssm_latency_ms,
+                'sqs': args.sqs_latency_ms,
+                's3': args.s3_latency_ms,
+            },
+            'python': sys.version.split()[0],
+        },
+        'api': api_results,
+        'processor': processor_results,
+        'peak_rss_mb': harness.peak_rss_mb(),
+    }
+    harness.write_results(results, args.output)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print('Regressions detected:', file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Archive serialization benchmark
+
+Compares the processor's archive formats on generated messages: time per
+record, output size and peak traced memory while serializing. The compact
+format is measured both with the raw SQS body spliced in (the default
+pipeline) and with the parsed email re-encoded (after a transform stage
+changed it).
+
+Usage:
+    python benchmarks/bench_serialization.py --records 20000 --output serialization.json
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import bench_pipeline
+import harness
+from fakes import FakeAWS
+
+
+def build_records(processor_app, count: int, seed: int):
+    """Build ArchiveRecords the way the S3 sink would, keeping the raw SQS bodies"""
+    payloads = bench_pipeline.build_payloads(count, senders=50, seed=seed)
+    processed_at = datetime.now(timezone.utc).isoformat()
+    records = []
+    for index, payload in enumerate(payloads):
+        raw_body = json.dumps(payload['data'])
+        records.append(processor_app.ArchiveRecord(
+            f"00000000-0000-0000-0000-{index:012d}", processed_at, json.loads(raw_body), raw_body
+        ))
+    return records
+
+
+def measure(serialize, records, repeat: int):
+    """Best-of-repeat wall time, output size and traced allocations for one serializer"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for record in records:
+            serialize(record)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    total_bytes = sum(len(serialize(record)) for record in records)
+
+    tracemalloc.start()
+    for record in records:
+        serialize(record)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'records': len(records),
+        'us_per_record': round(best / len(records) * 1e6, 3),
+        'records_per_second': round(len(records) / best, 1),
+        'avg_bytes': round(total_bytes / len(records), 1),
+        'peak_traced_kib': round(peak / 1024, 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=10000, help='Number of records to serialize')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    parser.add_argument('--seed', type=int, default=1234, help='Seed for payload generation')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    harness.configure_environment('WARNING')
+    processor_app = harness.load_service('email-processor', FakeAWS())
+
+    records = build_records(processor_app, args.records, args.seed)
+    reencoded = [
+        processor_app.ArchiveRecord(record.message_id, record.processed_at, record.email_data)
+        for record in records
+    ]
+
+    pretty = processor_app.PrettyArchiveSerializer()
+    compact = processor_app.CompactArchiveSerializer()
+    results = {
+        'config': {'records': args.records, 'repeat': args.repeat, 'python': sys.version.split()[0]},
+        'pretty': measure(pretty.serialize, records, args.repeat),
+        'compact_raw_body': measure(compact.serialize, records, args.repeat),
+        'compact_reencoded': measure(compact.serialize, reencoded, args.repeat),
+    }
+    baseline = results['pretty']['us_per_record']
+    for name in ('compact_raw_body', 'compact_reencoded'):
+        results[name]['speedup_vs_pretty'] = round(baseline / results[name]['us_per_record'], 2)
+        results[name]['size_vs_pretty'] = round(results[name]['avg_bytes'] / results['pretty']['avg_bytes'], 3)
+
+    harness.write_results(results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""In-process stand-ins for the SSM, SQS and S3 clients used by the services.
+
+Only the operations the services actually call are implemented. Every call is
+counted and can be slowed down by a per-service injected latency so the
+benchmark can model a remote AWS endpoint without touching the network.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code: str, message: str, operation_name: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation_name)
+
+
+class FakeAWS:
+    """Shared state and call accounting for all fake clients"""
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None):
+        # Injected latency in seconds, keyed by service name ('ssm', 'sqs', 's3')
+        self.latency = dict(latency or {})
+        self.calls = Counter()
+        self.parameters: Dict[str, str] = {}
+        self.queues: Dict[str, '_Queue'] = {}
+        self.buckets: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name: str, region_name: Optional[str] = None, **kwargs):
+        """Drop-in replacement for boto3.client"""
+        clients = {'ssm': FakeSSM, 'sqs': FakeSQS, 's3': FakeS3}
+        if service_name not in clients:
+            raise ValueError(f"No fake client available for service: {service_name}")
+        return clients[service_name](self, region_name or 'us-west-2')
+
+    def put_parameter(self, name: str, value: str):
+        self.parameters[name] = value
+
+    def create_queue(self, name: str, region_name: str = 'us-west-2') -> str:
+        queue_url = f"https://sqs.{region_name}.amazonaws.com/000000000000/{name}"
+        self.queues[queue_url] = _Queue(name)
+        return queue_url
+
+    def create_bucket(self, name: str):
+        self.buckets[name] = {}
+
+    def record(self, service: str, operation: str):
+        """Count an API call and sleep for the injected service latency"""
+        with self._lock:
+            self.calls[f"{service}:{operation}"] += 1
+        delay = self.latency.get(service, 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+
+class _FakeClient:
+    service_name = ''
+
+    def __init__(self, aws: FakeAWS, region_name: str):
+        self._aws = aws
+        self.region_name = region_name
+
+    def _record(self, operation: str):
+        self._aws.record(self.service_name, operation)
+
+    def close(self):
+        pass
+
+
+class FakeSSM(_FakeClient):
+    service_name = 'ssm'
+
+    def get_parameter(self, Name: str, WithDecryption: bool = False) -> Dict:
+        self._record('GetParameter')
+        if Name not in self._aws.parameters:
+            raise _client_error('ParameterNotFound', f"Parameter {Name} not found", 'GetParameter')
+        return {'Parameter': {'Name': Name, 'Type': 'String', 'Value': self._aws.parameters[Name]}}
+
+
+class _Queue:
+    """Visible messages plus in-flight messages keyed by receipt handle"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.visible = deque()
+        self.in_flight: Dict[str, tuple] = {}
+        self.condition = threading.Condition()
+
+    def requeue_expired(self, now: float):
+        expired = [handle for handle, (deadline, _) in self.in_flight.items() if deadline <= now]
+        for handle in expired:
+            _, message = self.in_flight.pop(handle)
+            self.visible.append(message)
+
+
+class FakeSQS(_FakeClient):
+    service_name = 'sqs'
+
+    def _queue(self, QueueUrl: str, operation: str) -> _Queue:
+        queue = self._aws.queues.get(QueueUrl)
+        if queue is None:
+            raise _client_error('AWS.SimpleQueueService.NonExistentQueue',
+                                'The specified queue does not exist.', operation)
+        return queue
+
+    def send_message(self, QueueUrl: str, MessageBody: str, MessageAttributes: Optional[Dict] = None,
+                     **kwargs) -> Dict:
+        self._record('SendMessage')
+        queue = self._queue(QueueUrl, 'SendMessage')
+        message_id = str(uuid.uuid4())
+        message = {
+            'MessageId': message_id,
+            'Body': MessageBody,
+            'MD5OfBody': hashlib.md5(MessageBody.encode('utf-8')).hexdigest(),
+            'MessageAttributes': dict(MessageAttributes or {}),
+            'Attributes': {
+                'SentTimestamp': str(int(time.time() * 1000)),
+                'ApproximateReceiveCount': '0',
+            },
+        }
+        with queue.condition:
+            queue.visible.append(message)
+            queue.condition.notify()
+        return {'MessageId': message_id, 'MD5OfMessageBody': message['MD5OfBody']}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, WaitTimeSeconds: int = 0,
+                        VisibilityTimeout: int = 30, MessageAttributeNames: Optional[list] = None,
+                        AttributeNames: Optional[list] = None, **kwargs) -> Dict:
+        self._record('ReceiveMessage')
+        queue = self._queue(QueueUrl, 'ReceiveMessage')
+        deadline = time.monotonic() + WaitTimeSeconds
+        received = []
+        with queue.condition:
+            while True:
+                now = time.monotonic()
+                queue.requeue_expired(now)
+                if queue.visible or now >= deadline:
+                    break
+                queue.condition.wait(deadline - now)
+
+            while queue.visible and len(received) < MaxNumberOfMessages:
+                message = queue.visible.popleft()
+                message['Attributes']['ApproximateReceiveCount'] = str(
+                    int(message['Attributes']['ApproximateReceiveCount']) + 1)
+                receipt_handle = uuid.uuid4().hex
+                queue.in_flight[receipt_handle] = (now + VisibilityTimeout, message)
+                received.append(self._render(message, receipt_handle, MessageAttributeNames, AttributeNames))
+
+        return {'Messages': received} if received else {}
+
+    @staticmethod
+    def _render(message: Dict, receipt_handle: str, attribute_names, system_attribute_names) -> Dict:
+        rendered = {
+            'MessageId': message['MessageId'],
+            'ReceiptHandle': receipt_handle,
+            'MD5OfBody': message['MD5OfBody'],
+            'Body': message['Body'],
+        }
+        if attribute_names and message['MessageAttributes']:
+            if 'All' in attribute_names:
+                rendered['MessageAttributes'] = dict(message['MessageAttributes'])
+            else:
+                rendered['MessageAttributes'] = {
+                    name: value for name, value in message['MessageAttributes'].items()
+                    if name in attribute_names
+                }
+        if system_attribute_names:
+            if 'All' in system_attribute_names:
+                rendered['Attributes'] = dict(message['Attributes'])
+            else:
+                rendered['Attributes'] = {
+                    name: value for name, value in message['Attributes'].items()
+                    if name in system_attribute_names
+                }
+        return rendered
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str, **kwargs) -> Dict:
+        self._record('DeleteMessage')
+        queue = self._queue(QueueUrl, 'DeleteMessage')
+        with queue.condition:
+            queue.in_flight.pop(ReceiptHandle, None)
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: list, **kwargs) -> Dict:
+        self._record('DeleteMessageBatch')
+        queue = self._queue(QueueUrl, 'DeleteMessageBatch')
+        if len(Entries) > 10:
+            raise _client_error('AWS.SimpleQueueService.TooManyEntriesInBatchRequest',
+                                'Maximum number of entries per request are 10.', 'DeleteMessageBatch')
+        with queue.condition:
+            for entry in Entries:
+                queue.in_flight.pop(entry['ReceiptHandle'], None)
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: Optional[list] = None, **kwargs) -> Dict:
+        self._record('GetQueueAttributes')
+        queue = self._queue(QueueUrl, 'GetQueueAttributes')
+        with queue.condition:
+            queue.requeue_expired(time.monotonic())
+            attributes = {
+                'QueueArn': f"arn:aws:sqs:{self.region_name}:000000000000:{queue.name}",
+                'ApproximateNumberOfMessages': str(len(queue.visible)),
+                'ApproximateNumberOfMessagesNotVisible': str(len(queue.in_flight)),
+                'ApproximateNumberOfMessagesDelayed': '0',
+            }
+        if AttributeNames and 'All' not in AttributeNames:
+            attributes = {name: value for name, value in attributes.items() if name in AttributeNames}
+        return {'Attributes': attributes}
+
+
+class FakeS3(_FakeClient):
+    service_name = 's3'
+
+    def _bucket(self, Bucket: str, operation: str) -> Dict:
+        bucket = self._aws.buckets.get(Bucket)
+        if bucket is None:
+            raise _client_error('NoSuchBucket', 'The specified bucket does not exist', operation)
+        return bucket
+
+    def head_bucket(self, Bucket: str, **kwargs) -> Dict:
+        self._record('HeadBucket')
+        if Bucket not in self._aws.buckets:
+            raise _client_error('404', 'Not Found', 'HeadBucket')
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body=b'', ContentType: Optional[str] = None,
+                   Metadata: Optional[Dict] = None, **kwargs) -> Dict:
+        self._record('PutObject')
+        bucket = self._bucket(Bucket, 'PutObject')
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        elif not isinstance(Body, bytes):
+            Body = bytes(Body)
+        bucket[Key] = {
+            'Body': Body,
+            'ContentType': ContentType,
+            'Metadata': dict(Metadata or {}),
+            'LastModified': datetime.now(timezone.utc),
+        }
+        return {'ETag': f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        self._record('GetObject')
+        bucket = self._bucket(Bucket, 'GetObject')
+        if Key not in bucket:
+            raise _client_error('NoSuchKey', 'The specified key does not exist.', 'GetObject')
+        stored = bucket[Key]
+        return {
+            'Body': stored['Body'],
+            'ContentLength': len(stored['Body']),
+            'ContentType': stored['ContentType'],
+            'Metadata': dict(stored['Metadata']),
+        }
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        self._record('DeleteObject')
+        self._bucket(Bucket, 'DeleteObject').pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', MaxKeys: int = 1000,
+                        ContinuationToken: Optional[str] = None, **kwargs) -> Dict:
+        self._record('ListObjectsV2')
+        keys = sorted(key for key in self._bucket(Bucket, 'ListObjectsV2') if key.startswith(Prefix))
+        if ContinuationToken:
+            keys = [key for key in keys if key > ContinuationToken]
+        page, remainder = keys[:MaxKeys], keys[MaxKeys:]
+        bucket = self._aws.buckets[Bucket]
+        response = {
+            'Contents': [
+                {'Key': key, 'Size': len(bucket[key]['Body']), 'LastModified': bucket[key]['LastModified']}
+                for key in page
+            ],
+            'KeyCount': len(page),
+            'IsTruncated': bool(remainder),
+        }
+        if remainder:
+            response['NextContinuationToken'] = page[-1]
+        return response
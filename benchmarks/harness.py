@@ -0,0 +1,102 @@
+"""Helpers for loading the services against the fake AWS clients and summarising results"""
+import importlib.util
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+from typing import Dict, List, Sequence
+
+import boto3
+
+from fakes import FakeAWS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES_DIR = os.path.join(REPO_ROOT, 'services')
+
+AUTH_TOKEN_PARAMETER = '/email-service/auth-token'
+SQS_QUEUE_URL_PARAMETER = '/email-service/sqs-queue-url'
+S3_BUCKET_NAME_PARAMETER = '/email-service/s3-bucket-name'
+SQS_SHARD_URLS_PARAMETER = '/email-service/sqs-queue-shard-urls'
+AUTH_TOKEN = 'benchmark-token'
+QUEUE_NAME = 'benchmark-email-processing-queue'
+BUCKET_NAME = 'benchmark-email-archive'
+
+
+def build_fake_aws(latency: Dict[str, float], shards: int = 0) -> FakeAWS:
+    """Create fake AWS state seeded with the parameters, queues and bucket the services expect"""
+    aws = FakeAWS(latency=latency)
+    queue_url = aws.create_queue(QUEUE_NAME)
+    aws.create_bucket(BUCKET_NAME)
+    aws.put_parameter(AUTH_TOKEN_PARAMETER, AUTH_TOKEN)
+    aws.put_parameter(SQS_QUEUE_URL_PARAMETER, queue_url)
+    aws.put_parameter(S3_BUCKET_NAME_PARAMETER, BUCKET_NAME)
+    if shards:
+        shard_urls = [aws.create_queue(f"{QUEUE_NAME}-shard-{index}") for index in range(shards)]
+        aws.put_parameter(SQS_SHARD_URLS_PARAMETER, ','.join(shard_urls))
+    return aws
+
+
+def configure_environment(log_level: str = 'WARNING', shards: int = 0):
+    """Point the services at a scratch log directory and the benchmark SSM parameters"""
+    os.environ.setdefault('LOG_DIR', tempfile.mkdtemp(prefix='email-bench-logs-'))
+    os.environ['LOG_LEVEL'] = log_level
+    os.environ.setdefault('AWS_REGION', 'us-west-2')
+    os.environ['SSM_PARAMETER_NAME'] = AUTH_TOKEN_PARAMETER
+    os.environ['SQS_QUEUE_URL_PARAMETER'] = SQS_QUEUE_URL_PARAMETER
+    os.environ['S3_BUCKET_NAME_PARAMETER'] = S3_BUCKET_NAME_PARAMETER
+    os.environ['SQS_SHARD_URLS_PARAMETER'] = SQS_SHARD_URLS_PARAMETER if shards else ''
+
+
+def load_service(service: str, aws: FakeAWS):
+    """Import services/<service>/app.py with boto3.client routed to the fakes"""
+    module_name = service.replace('-', '_') + '_app'
+    path = os.path.join(SERVICES_DIR, service, 'app.py')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+
+    # EmailProcessor creates its clients in __init__, after import, so the
+    # patch stays in place for the lifetime of the benchmark process.
+    boto3.client = aws.client
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary_ms(samples: List[float]) -> Dict[str, float]:
+    """Summarise a list of durations in seconds as millisecond percentiles"""
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p90_ms': round(percentile(samples, 90) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KiB everywhere else
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 2)
+    return round(peak / 1024, 2)
+
+
+def write_results(results: Dict, output_path: str = None):
+    """Print results as JSON and optionally save them to a file"""
+    rendered = json.dumps(results, indent=2, sort_keys=True)
+    print(rendered)
+    if output_path:
+        with open(output_path, 'w') as fh:
+            fh.write(rendered + '\n')
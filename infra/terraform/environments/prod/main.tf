@@ -74,6 +74,7 @@ module "messaging" {
   email_validation_role_arn = module.eks.email_validation_service_role_arn
   email_processor_role_arn  = module.eks.email_processor_service_role_arn
   email_validation_token    = var.email_validation_token
+  queue_shard_count         = var.queue_shard_count
 }
 
 # Configure Kubernetes and Helm providers
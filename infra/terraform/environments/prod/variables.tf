@@ -69,4 +69,10 @@ variable "email_validation_token" {
   description = "Authentication token for email validation service"
   sensitive   = true
   default     = "$DJISA<$#45ex3RtYr"
-}
\ No newline at end of file
+}
+
+variable "queue_shard_count" {
+  description = "Number of sender-sharded processing queues (0 keeps the single shared queue)"
+  type        = number
+  default     = 0
+}
@@ -466,6 +466,7 @@ resource "aws_iam_policy" "email_validation_service_policy" {
         ]
         Resource = [
           "arn:aws:sqs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:${var.prefix}-email-processing-queue",
+          "arn:aws:sqs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:${var.prefix}-email-processing-shard-*",
           "arn:aws:sqs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:${var.prefix}-email-processing-dlq"
         ]
       },
@@ -478,7 +479,8 @@ resource "aws_iam_policy" "email_validation_service_policy" {
         ]
         Resource = [
           "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/auth-token",
-          "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/sqs-queue-url"
+          "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/sqs-queue-url",
+          "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/sqs-queue-shard-urls"
         ]
       },
       {
@@ -566,6 +568,7 @@ resource "aws_iam_policy" "email_processor_service_policy" {
         ]
         Resource = [
           "arn:aws:sqs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:${var.prefix}-email-processing-queue",
+          "arn:aws:sqs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:${var.prefix}-email-processing-shard-*",
           "arn:aws:sqs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:${var.prefix}-email-processing-dlq"
         ]
       },
@@ -578,6 +581,7 @@ resource "aws_iam_policy" "email_processor_service_policy" {
         ]
         Resource = [
           "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/sqs-queue-url",
+          "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/sqs-queue-shard-urls",
           "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/email-service/s3-bucket-name"
         ]
       },
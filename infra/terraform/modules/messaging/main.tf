@@ -34,6 +34,32 @@ resource "aws_sqs_queue" "email_processing_dlq" {
   }
 }
 
+# Optional sender-sharded queues. The validation service routes each message
+# to one shard by a hash of email_sender; processors split the shards between
+# themselves. Disabled when queue_shard_count is 0.
+resource "aws_sqs_queue" "email_processing_shard" {
+  count = var.queue_shard_count
+
+  name                       = "${var.prefix}-email-processing-shard-${count.index}"
+  delay_seconds              = 0
+  max_message_size           = 262144
+  message_retention_seconds  = 1209600 # 14 days
+  receive_wait_time_seconds  = 10      # Long polling
+  visibility_timeout_seconds = 300     # 5 minutes
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.email_processing_dlq.arn
+    maxReceiveCount     = 3
+  })
+
+  tags = {
+    Name        = "${var.prefix}-email-processing-shard-${count.index}"
+    Environment = var.environment
+    Service     = "email-validation"
+    Shard       = tostring(count.index)
+  }
+}
+
 # SQS Queue Policy
 resource "aws_sqs_queue_policy" "email_processing_queue_policy" {
   queue_url = aws_sqs_queue.email_processing_queue.id
@@ -62,6 +88,35 @@ resource "aws_sqs_queue_policy" "email_processing_queue_policy" {
   })
 }
 
+resource "aws_sqs_queue_policy" "email_processing_shard_policy" {
+  count = var.queue_shard_count
+
+  queue_url = aws_sqs_queue.email_processing_shard[count.index].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "AllowEKSPodsAccess"
+        Effect = "Allow"
+        Principal = {
+          AWS = [
+            var.email_validation_role_arn,
+            var.email_processor_role_arn
+          ]
+        }
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.email_processing_shard[count.index].arn
+      }
+    ]
+  })
+}
+
 # SSM Parameter for Email Validation Token
 resource "aws_ssm_parameter" "email_validation_token" {
   name        = "/email-service/auth-token"
@@ -88,4 +143,20 @@ resource "aws_ssm_parameter" "sqs_queue_url" {
     Environment = var.environment
     Service     = "email-validation"
   }
-}
\ No newline at end of file
+}
+
+# Comma separated shard queue URLs, ordered by shard index
+resource "aws_ssm_parameter" "sqs_queue_shard_urls" {
+  count = var.queue_shard_count > 0 ? 1 : 0
+
+  name        = "/email-service/sqs-queue-shard-urls"
+  description = "Sender-sharded SQS queue URLs for email processing, ordered by shard index"
+  type        = "StringList"
+  value       = join(",", aws_sqs_queue.email_processing_shard[*].url)
+
+  tags = {
+    Name        = "email-service-sqs-shard-urls"
+    Environment = var.environment
+    Service     = "email-validation"
+  }
+}
@@ -21,4 +21,14 @@ output "ssm_parameter_name" {
 output "sqs_queue_url_ssm_parameter" {
   description = "Name of the SSM parameter containing the SQS queue URL"
   value       = aws_ssm_parameter.sqs_queue_url.name
-}
\ No newline at end of file
+}
+
+output "sqs_shard_queue_urls" {
+  description = "URLs of the sender-sharded SQS queues, ordered by shard index"
+  value       = aws_sqs_queue.email_processing_shard[*].url
+}
+
+output "sqs_shard_urls_ssm_parameter" {
+  description = "Name of the SSM parameter containing the shard queue URLs (null when sharding is disabled)"
+  value       = one(aws_ssm_parameter.sqs_queue_shard_urls[*].name)
+}
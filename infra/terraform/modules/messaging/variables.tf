@@ -28,4 +28,10 @@ variable "email_validation_token" {
   type        = string
   description = "Authentication token for email validation service"
   sensitive   = true
-}
\ No newline at end of file
+}
+
+variable "queue_shard_count" {
+  description = "Number of sender-sharded processing queues to create (0 disables sharding)"
+  type        = number
+  default     = 0
+}
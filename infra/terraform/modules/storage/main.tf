@@ -44,6 +44,34 @@ resource "aws_s3_bucket_versioning" "email_storage_versioning" {
   }
 }
 
+# S3 Bucket Lifecycle
+# In sharded mode each email processor overwrites a heartbeat object under
+# coordination/ every 30s. With versioning enabled every overwrite keeps a
+# noncurrent version, so expire those and the delete markers left when a
+# replica shuts down. Archived mail under emails/ is not affected.
+resource "aws_s3_bucket_lifecycle_configuration" "email_storage_lifecycle" {
+  bucket = aws_s3_bucket.email_storage.id
+
+  rule {
+    id     = "expire-coordination-history"
+    status = "Enabled"
+
+    filter {
+      prefix = "coordination/"
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+
+    expiration {
+      expired_object_delete_marker = true
+    }
+  }
+
+  depends_on = [aws_s3_bucket_versioning.email_storage_versioning]
+}
+
 # S3 Bucket Public Access Block
 resource "aws_s3_bucket_public_access_block" "email_storage_pab" {
   bucket = aws_s3_bucket.email_storage.id
@@ -1,22 +1,28 @@
+import abc
+import hashlib
 import json
 import logging
+import math
+import random
 import sys
 import time
 import os
+from collections import deque
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 import signal
+import socket
 import threading
 
 # Configure logging
-log_dir = '/app/logs'
+log_dir = os.getenv('LOG_DIR', '/app/logs')
 os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, 'processor.log')
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler(log_file),
@@ -25,6 +31,437 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class LatencyTracker:
+    """Rolling window of latency samples for one pipeline stage"""
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> Dict:
+        if not self.samples:
+            return {'count': self.count}
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            return round(ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)] * 1000, 3)
+
+        return {
+            'count': self.count,
+            'p50_ms': pct(50),
+            'p90_ms': pct(90),
+            'p99_ms': pct(99),
+            'max_ms': round(ordered[-1] * 1000, 3)
+        }
+
+class DeliveryMetrics:
+    """Per-stage delivery latency for messages travelling API -> SQS -> S3
+
+    Stages, all derived from the message trace context:
+      api_to_enqueue     - API receipt (ingested_at) to SQS SentTimestamp
+      queue_dwell        - SQS SentTimestamp to the poll that received it
+      batch_wait         - poll return to the start of archiving the message
+      s3_upload          - duration of the S3 put
+      enqueue_to_archive - SQS SentTimestamp to the object landing in S3
+      end_to_end         - API receipt to the object landing in S3
+    """
+    STAGES = ('api_to_enqueue', 'queue_dwell', 'batch_wait', 's3_upload', 'enqueue_to_archive', 'end_to_end')
+
+    def __init__(self, window: int = 1000, slow_threshold_seconds: float = 60.0, slow_sample_rate: float = 0.1):
+        self.trackers = {stage: LatencyTracker(window) for stage in self.STAGES}
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self.slow_sample_rate = slow_sample_rate
+        self.slow_count = 0
+
+    def record(self, message_id: str, trace: Dict, archived_at: float):
+        """Record the stage timings of one archived message"""
+        stages = {
+            'batch_wait': trace['started_at'] - trace['received_at'],
+            's3_upload': archived_at - trace['upload_started_at']
+        }
+        if trace.get('sent_at') is not None:
+            stages['queue_dwell'] = trace['received_at'] - trace['sent_at']
+            stages['enqueue_to_archive'] = archived_at - trace['sent_at']
+        if trace.get('ingested_at') is not None:
+            stages['end_to_end'] = archived_at - trace['ingested_at']
+            if trace.get('sent_at') is not None:
+                stages['api_to_enqueue'] = trace['sent_at'] - trace['ingested_at']
+
+        for stage, seconds in stages.items():
+            # Clamp small negatives caused by clock skew between API pods, SQS and this host
+            self.trackers[stage].record(max(0.0, seconds))
+
+        total = stages.get('end_to_end', stages.get('enqueue_to_archive', 0.0))
+        if total >= self.slow_threshold_seconds:
+            self.slow_count += 1
+            if random.random() < self.slow_sample_rate:
+                breakdown = ', '.join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in stages.items())
+                logger.warning(f"[{trace.get('request_id') or 'unknown'}] Slow delivery for message {message_id}: {breakdown}")
+
+    def summary(self) -> Dict:
+        summary = {stage: tracker.summary() for stage, tracker in self.trackers.items()}
+        summary['slow_messages'] = self.slow_count
+        return summary
+
+class ShardCoordinator:
+    """Splits queue shards between live processor replicas
+
+    Each replica writes a heartbeat object under a shared S3 prefix and treats
+    every member whose heartbeat is younger than member_ttl as live. Queues are
+    assigned by rendezvous hashing over the live members, so every replica
+    reaches the same assignment independently and only the shards of a
+    joining or departing replica move. start() heartbeats from a background
+    thread, so a long poll or slow batch in the main loop cannot let the
+    heartbeat lapse.
+    """
+    def __init__(self, s3_client, bucket: str, queue_urls: List[str], member_id: str,
+                 heartbeat_interval: int = 30, member_ttl: int = 90,
+                 prefix: str = 'coordination/email-processor/members/'):
+        if member_ttl <= heartbeat_interval:
+            raise ValueError(f"Shard member TTL ({member_ttl}s) must be longer than the heartbeat "
+                             f"interval ({heartbeat_interval}s)")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.queue_urls = list(queue_urls)
+        self.member_id = member_id
+        self.heartbeat_interval = heartbeat_interval
+        self.member_ttl = member_ttl
+        self.prefix = prefix
+        self.members = [member_id]
+        self.assigned = []
+        self._last_refresh = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _score(member_id: str, queue_url: str) -> str:
+        return hashlib.md5(f"{member_id}|{queue_url}".encode('utf-8')).hexdigest()
+
+    def owner(self, queue_url: str, members: List[str]) -> str:
+        """Rendezvous hash: the member with the highest score owns the queue"""
+        return max(members, key=lambda member_id: self._score(member_id, queue_url))
+
+    def _heartbeat(self):
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}{self.member_id}",
+            Body=b'',
+            ContentType='text/plain'
+        )
+
+    def _live_members(self) -> List[str]:
+        cutoff = datetime.now(timezone.utc).timestamp() - self.member_ttl
+        members = {self.member_id}
+        paginator_args = {'Bucket': self.bucket, 'Prefix': self.prefix}
+        while True:
+            response = self.s3_client.list_objects_v2(**paginator_args)
+            for obj in response.get('Contents', []):
+                if obj['LastModified'].timestamp() >= cutoff:
+                    members.add(obj['Key'][len(self.prefix):])
+            if not response.get('IsTruncated'):
+                break
+            paginator_args['ContinuationToken'] = response['NextContinuationToken']
+        return sorted(members)
+
+    def refresh(self, force: bool = False) -> List[str]:
+        """Heartbeat and recompute the assignment when the interval has elapsed"""
+        with self._lock:
+            return self._refresh(force)
+
+    def _refresh(self, force: bool) -> List[str]:
+        now = time.monotonic()
+        if not force and self._last_refresh is not None and now - self._last_refresh < self.heartbeat_interval:
+            return self.assigned
+        self._last_refresh = now
+
+        try:
+            self._heartbeat()
+            members = self._live_members()
+        except Exception as e:
+            # Keep the previous assignment rather than dropping shards on a transient error
+            logger.error(f"Shard membership refresh failed, keeping current assignment: {str(e)}")
+            return self.assigned
+
+        assigned = [url for url in self.queue_urls if self.owner(url, members) == self.member_id]
+        if members != self.members or assigned != self.assigned:
+            logger.info(f"Shard assignment updated: {len(members)} live members, "
+                        f"{len(assigned)}/{len(self.queue_urls)} queues assigned to {self.member_id}")
+        self.members = members
+        self.assigned = assigned
+        return assigned
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.refresh(force=True)
+
+    def start(self):
+        """Join immediately and keep heartbeating in a daemon thread"""
+        self.refresh(force=True)
+        self._thread = threading.Thread(target=self._heartbeat_loop, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+
+    def leave(self):
+        """Stop heartbeating and remove this member's heartbeat so its shards move immediately"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat_interval)
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket, Key=f"{self.prefix}{self.member_id}")
+        except Exception as e:
+            logger.warning(f"Failed to remove shard membership heartbeat: {str(e)}")
+
+ARCHIVE_METADATA = {
+    'processor_version': '1.0.0',
+    'source': 'email-validation-service'
+}
+
+class ArchiveRecord:
+    """A processed message as archived to S3
+
+    raw_email_data holds the original SQS body when no stage changed the
+    parsed email, so the compact serializer can splice it in verbatim instead
+    of encoding the dict again.
+    """
+    __slots__ = ('message_id', 'processed_at', 'email_data', 'raw_email_data')
+
+    def __init__(self, message_id: str, processed_at: str, email_data: Dict, raw_email_data: Optional[str] = None):
+        self.message_id = message_id
+        self.processed_at = processed_at
+        self.email_data = email_data
+        self.raw_email_data = raw_email_data
+
+    def as_dict(self) -> Dict:
+        return {
+            'message_id': self.message_id,
+            'processed_at': self.processed_at,
+            'email_data': self.email_data,
+            'metadata': ARCHIVE_METADATA
+        }
+
+class PrettyArchiveSerializer:
+    """Original indented JSON format"""
+    name = 'pretty'
+
+    def serialize(self, record: ArchiveRecord) -> bytes:
+        return json.dumps(record.as_dict(), indent=2).encode('utf-8')
+
+class CompactArchiveSerializer:
+    """Compact UTF-8 JSON written into a buffer reused across messages
+
+    The returned bytearray is only valid until the next call, which is fine
+    for put_object since it has finished reading the body when it returns.
+    """
+    name = 'compact'
+    _METADATA = json.dumps(ARCHIVE_METADATA, separators=(',', ':')).encode('utf-8')
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+    def serialize(self, record: ArchiveRecord) -> bytearray:
+        buffer = self._buffer
+        del buffer[:]
+        buffer += b'{"message_id":'
+        buffer += self._encoder.encode(record.message_id).encode('utf-8')
+        buffer += b',"processed_at":"'
+        buffer += record.processed_at.encode('ascii')
+        buffer += b'","email_data":'
+        if record.raw_email_data is not None:
+            buffer += record.raw_email_data.encode('utf-8')
+        else:
+            buffer += self._encoder.encode(record.email_data).encode('utf-8')
+        buffer += b',"metadata":'
+        buffer += self._METADATA
+        buffer += b'}'
+        return buffer
+
+ARCHIVE_SERIALIZERS = {
+    serializer.name: serializer
+    for serializer in (CompactArchiveSerializer, PrettyArchiveSerializer)
+}
+
+class PipelineItem:
+    """One SQS message as it moves through the processing pipeline"""
+    __slots__ = ('message', 'message_id', 'receipt_handle', 'queue_url', 'trace', 'body', 'body_modified', 'error')
+
+    def __init__(self, message: Dict, queue_url: str, trace: Dict):
+        self.message = message
+        self.message_id = message['MessageId']
+        self.receipt_handle = message['ReceiptHandle']
+        self.queue_url = queue_url
+        self.trace = trace
+        self.body = None
+        # Set once a stage may have changed body relative to the raw SQS message
+        self.body_modified = False
+        self.error = None
+
+    def fail(self, error: str):
+        self.error = error
+
+class PipelineStage(abc.ABC):
+    """A step that works on a whole batch of items at once
+
+    Stages receive only the items that are still live. To drop an item, call
+    item.fail(); failed items skip the remaining stages and stay in the queue
+    for redelivery. An exception escaping process() fails every item in the
+    batch, so stages should check each item and fail only the bad ones.
+
+    Stages that leave item.body as parsed from the message should set
+    mutates_body = False so the raw body can be archived as is. Only durable
+    sinks set acknowledges = True; messages are deleted from SQS only when
+    the pipeline contains one.
+    """
+    name = 'stage'
+    mutates_body = True
+    acknowledges = False
+
+    def __init__(self, processor: 'EmailProcessor'):
+        self.processor = processor
+
+    @abc.abstractmethod
+    def process(self, items: List[PipelineItem]):
+        """Process the live items of a batch in place"""
+
+class ParseStage(PipelineStage):
+    """Decode the JSON message body"""
+    name = 'parse'
+    mutates_body = False
+
+    def process(self, items: List[PipelineItem]):
+        for item in items:
+            try:
+                item.body = json.loads(item.message['Body'])
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid JSON in message {item.message_id}: {str(e)}")
+                item.fail('invalid_json')
+
+class ValidateStage(PipelineStage):
+    """Reject bodies that are not JSON objects"""
+    name = 'validate'
+    mutates_body = False
+
+    def process(self, items: List[PipelineItem]):
+        for item in items:
+            if not isinstance(item.body, dict):
+                logger.error(f"Message {item.message_id} body is not a valid object")
+                item.fail('invalid_body')
+
+class NormalizeStage(PipelineStage):
+    """Trim whitespace from string fields"""
+    name = 'normalize'
+
+    def process(self, items: List[PipelineItem]):
+        for item in items:
+            if not isinstance(item.body, dict):
+                logger.error(f"Message {item.message_id} body is not a valid object, cannot normalize")
+                item.fail('invalid_body')
+                continue
+            for key, value in item.body.items():
+                if isinstance(value, str):
+                    item.body[key] = value.strip()
+
+class SizeStatsStage(PipelineStage):
+    """Annotate each email with content size statistics"""
+    name = 'size_stats'
+
+    def process(self, items: List[PipelineItem]):
+        for item in items:
+            if not isinstance(item.body, dict):
+                logger.error(f"Message {item.message_id} body is not a valid object, cannot compute size stats")
+                item.fail('invalid_body')
+                continue
+            content = item.body.get('email_content') or ''
+            if not isinstance(content, str):
+                logger.error(f"Message {item.message_id} has non-string email_content")
+                item.fail('invalid_content')
+                continue
+            item.body['content_stats'] = {
+                'bytes': len(content.encode('utf-8')),
+                'characters': len(content),
+                'lines': content.count('\n') + 1 if content else 0
+            }
+
+class S3SinkStage(PipelineStage):
+    """Archive each item to the processor's S3 bucket"""
+    name = 's3'
+    mutates_body = False
+    acknowledges = True
+
+    def process(self, items: List[PipelineItem]):
+        for item in items:
+            item.trace['started_at'] = time.time()
+            raw_body = None if item.body_modified else item.message['Body']
+            if not self.processor._upload_to_s3(item.body, item.message_id, item.trace, raw_body):
+                logger.error(f"Failed to upload message {item.message_id}, leaving in queue")
+                item.fail('upload_failed')
+
+class LogSinkStage(PipelineStage):
+    """Write items to the log; messages stay in SQS unless a durable sink also runs"""
+    name = 'log'
+    mutates_body = False
+
+    def process(self, items: List[PipelineItem]):
+        for item in items:
+            logger.info(f"Message {item.message_id}: {json.dumps(item.body, sort_keys=True)}")
+
+# Stages available to PROCESSOR_PIPELINE, by name
+PIPELINE_STAGES = {
+    stage.name: stage
+    for stage in (ParseStage, ValidateStage, NormalizeStage, SizeStatsStage, S3SinkStage, LogSinkStage)
+}
+
+DEFAULT_PIPELINE = 'parse,validate,s3'
+
+class ProcessingPipeline:
+    """Runs batches through a configured sequence of stages and times each stage"""
+    def __init__(self, stages: List[PipelineStage], window: int = 1000):
+        self.stages = stages
+        # Without a durable sink, processed messages must stay in the queue
+        self.acknowledges = any(stage.acknowledges for stage in stages)
+        self.stage_timings = {stage.name: LatencyTracker(window) for stage in stages}
+
+    @classmethod
+    def from_spec(cls, spec: str, processor: 'EmailProcessor', window: int = 1000) -> 'ProcessingPipeline':
+        """Build a pipeline from a comma separated list of stage names"""
+        names = [name.strip() for name in spec.split(',') if name.strip()]
+        unknown = [name for name in names if name not in PIPELINE_STAGES]
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages {unknown}; available: {sorted(PIPELINE_STAGES)}")
+        if not names or names[0] != 'parse':
+            raise ValueError(f"Processor pipeline must start with 'parse', got {names}")
+        sinks = sorted(name for name, stage in PIPELINE_STAGES.items() if stage.acknowledges)
+        if not any(PIPELINE_STAGES[name].acknowledges for name in names):
+            raise ValueError(f"Processor pipeline {names} has no durable sink; add one of {sinks}")
+        return cls([PIPELINE_STAGES[name](processor) for name in names], window)
+
+    def run(self, items: List[PipelineItem]) -> List[PipelineItem]:
+        """Run every stage over the live items, returning the items that made it through"""
+        live = list(items)
+        for stage in self.stages:
+            if not live:
+                break
+            started = time.perf_counter()
+            try:
+                stage.process(live)
+            except Exception as e:
+                logger.error(f"Pipeline stage '{stage.name}' failed for a batch of {len(live)} messages: {str(e)}",
+                             exc_info=True)
+                for item in live:
+                    item.fail(f"stage_error:{stage.name}")
+            self.stage_timings[stage.name].record(time.perf_counter() - started)
+            live = [item for item in live if item.error is None]
+            if stage.mutates_body:
+                for item in live:
+                    item.body_modified = True
+        return live
+
+    def summary(self) -> Dict:
+        return {name: tracker.summary() for name, tracker in self.stage_timings.items()}
+
 class EmailProcessor:
     def __init__(self):
         self.running = True
@@ -34,15 +471,40 @@ class EmailProcessor:
         self.queue_url = None
         self.s3_bucket = None
         self.sqs_queue_url_parameter = os.getenv('SQS_QUEUE_URL_PARAMETER', '/email-service/sqs-queue-url')
+        # Optional: when set, consume sender-sharded queues listed in this parameter
+        self.sqs_shard_urls_parameter = os.getenv('SQS_SHARD_URLS_PARAMETER', '')
+        self.shard_urls = []
+        self.shard_coordinator = None
+        self.shard_depths = {}
+        # Per-queue long poll wait when several queues are owned; 0 would be a
+        # short poll, which samples only some SQS servers and can miss messages
+        self.shard_poll_wait = int(os.getenv('SHARD_POLL_WAIT_SECONDS', '1'))
+        archive_format = os.getenv('ARCHIVE_FORMAT', 'compact')
+        if archive_format not in ARCHIVE_SERIALIZERS:
+            raise ValueError(f"Unknown ARCHIVE_FORMAT '{archive_format}'; available: {sorted(ARCHIVE_SERIALIZERS)}")
+        self.archive_serializer = ARCHIVE_SERIALIZERS[archive_format]()
         self.s3_bucket_name_parameter = os.getenv('S3_BUCKET_NAME_PARAMETER', '/email-service/s3-bucket-name')
         self.poll_interval = int(os.getenv('POLL_INTERVAL_SECONDS', '30'))
         self.max_messages = int(os.getenv('MAX_MESSAGES_PER_POLL', '10'))
         self.visibility_timeout = int(os.getenv('VISIBILITY_TIMEOUT_SECONDS', '300'))
+        self.metrics_log_interval = int(os.getenv('TRACE_METRICS_LOG_INTERVAL_SECONDS', '60'))
+        metrics_window = int(os.getenv('TRACE_WINDOW_SIZE', '1000'))
+        self.delivery_metrics = DeliveryMetrics(
+            window=metrics_window,
+            slow_threshold_seconds=int(os.getenv('TRACE_SLOW_THRESHOLD_MS', '60000')) / 1000.0,
+            slow_sample_rate=float(os.getenv('TRACE_SLOW_SAMPLE_RATE', '0.1'))
+        )
         
         self._initialize_aws_clients()
         self._get_sqs_queue_url_from_ssm()
         self._get_s3_bucket_name_from_ssm()
+        self._get_sqs_shard_urls_from_ssm()
         self._validate_configuration()
+        self._setup_shard_coordinator()
+        self.pipeline = ProcessingPipeline.from_spec(
+            os.getenv('PROCESSOR_PIPELINE', DEFAULT_PIPELINE), self, metrics_window
+        )
+        logger.info(f"Processing pipeline: {' -> '.join(stage.name for stage in self.pipeline.stages)}")
         
         # Setup graceful shutdown
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -91,6 +553,39 @@ class EmailProcessor:
             logger.error(f"Unexpected error retrieving S3 Bucket Name from SSM: {str(e)}")
             raise
     
+    def _get_sqs_shard_urls_from_ssm(self):
+        """Retrieve sender-sharded SQS Queue URLs from SSM Parameter Store"""
+        if not self.sqs_shard_urls_parameter:
+            return
+        try:
+            response = self.ssm_client.get_parameter(Name=self.sqs_shard_urls_parameter)
+            self.shard_urls = [url.strip() for url in response['Parameter']['Value'].split(',') if url.strip()]
+            logger.info(f"Retrieved {len(self.shard_urls)} SQS shard URLs from SSM parameter: {self.sqs_shard_urls_parameter}")
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            logger.error(f"Failed to retrieve SQS shard URLs from SSM parameter {self.sqs_shard_urls_parameter} ({error_code}): {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error retrieving SQS shard URLs from SSM: {str(e)}")
+            raise
+
+    def _setup_shard_coordinator(self):
+        """Enable sharded mode when shard queues are configured"""
+        if not self.shard_urls:
+            return
+        member_id = os.getenv('POD_NAME') or socket.gethostname()
+        # The shared queue joins the assignment too, so one replica keeps
+        # draining anything published before sharding was switched on
+        self.shard_coordinator = ShardCoordinator(
+            self.s3_client,
+            self.s3_bucket,
+            self.shard_urls + [self.queue_url],
+            member_id,
+            heartbeat_interval=int(os.getenv('SHARD_HEARTBEAT_INTERVAL_SECONDS', '30')),
+            member_ttl=int(os.getenv('SHARD_MEMBER_TTL_SECONDS', '90'))
+        )
+        logger.info(f"Sharded mode enabled as member {member_id} across {len(self.shard_urls)} shard queues")
+
     def _validate_configuration(self):
         """Validate required configuration"""
         if not self.queue_url:
@@ -105,9 +600,9 @@ class EmailProcessor:
         logger.info(f"Received signal {signum}, initiating graceful shutdown...")
         self.running = False
     
-    def _generate_s3_key(self, message_data: Dict, message_id: str) -> str:
+    def _generate_s3_key(self, message_data: Dict, message_id: str, timestamp: Optional[datetime] = None) -> str:
         """Generate S3 key for the email data"""
-        timestamp = datetime.now(timezone.utc)
+        timestamp = timestamp or datetime.now(timezone.utc)
         date_prefix = timestamp.strftime('%Y/%m/%d')
         
         # Extract email sender for better organization
@@ -116,34 +611,64 @@ class EmailProcessor:
         
         return f"emails/{date_prefix}/{safe_sender}/{message_id}_{timestamp.strftime('%H%M%S')}.json"
     
-    def _upload_to_s3(self, message_data: Dict, message_id: str) -> bool:
-        """Upload message data to S3"""
+    def _extract_trace(self, message: Dict, received_at: float) -> Dict:
+        """Build the trace context for a message from its SQS attributes"""
+        message_attributes = message.get('MessageAttributes') or {}
+        system_attributes = message.get('Attributes') or {}
+
+        trace = {
+            'request_id': message_attributes.get('request_id', {}).get('StringValue'),
+            'ingested_at': None,
+            'sent_at': None,
+            'received_at': received_at,
+            'started_at': time.time()
+        }
+        try:
+            if 'ingested_at' in message_attributes:
+                trace['ingested_at'] = int(message_attributes['ingested_at']['StringValue']) / 1000.0
+            if 'SentTimestamp' in system_attributes:
+                trace['sent_at'] = int(system_attributes['SentTimestamp']) / 1000.0
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Ignoring malformed trace attributes on message {message.get('MessageId')}: {str(e)}")
+        return trace
+
+    def _upload_to_s3(self, message_data: Dict, message_id: str, trace: Optional[Dict] = None,
+                      raw_body: Optional[str] = None) -> bool:
+        """Upload message data to S3
+
+        raw_body is the unmodified SQS body for message_data, if available.
+        """
         try:
-            s3_key = self._generate_s3_key(message_data, message_id)
+            processed_at = datetime.now(timezone.utc)
+            processed_at_iso = processed_at.isoformat()
+            s3_key = self._generate_s3_key(message_data, message_id, processed_at)
             
             # Prepare the data for S3 upload
-            upload_data = {
-                'message_id': message_id,
-                'processed_at': datetime.now(timezone.utc).isoformat(),
-                'email_data': message_data,
-                'metadata': {
-                    'processor_version': '1.0.0',
-                    'source': 'email-validation-service'
-                }
-            }
+            record = ArchiveRecord(message_id, processed_at_iso, message_data, raw_body)
             
+            metadata = {
+                'message-id': message_id,
+                'email-sender': message_data.get('email_sender', 'unknown'),
+                'processed-at': processed_at_iso
+            }
+            if trace:
+                if trace.get('request_id'):
+                    metadata['request-id'] = trace['request_id']
+                if trace.get('ingested_at') is not None:
+                    metadata['ingested-at'] = datetime.fromtimestamp(trace['ingested_at'], timezone.utc).isoformat()
+                trace['upload_started_at'] = time.time()
+
             # Upload to S3
             self.s3_client.put_object(
                 Bucket=self.s3_bucket,
                 Key=s3_key,
-                Body=json.dumps(upload_data, indent=2),
+                Body=self.archive_serializer.serialize(record),
                 ContentType='application/json',
-                Metadata={
-                    'message-id': message_id,
-                    'email-sender': message_data.get('email_sender', 'unknown'),
-                    'processed-at': datetime.now(timezone.utc).isoformat()
-                }
+                Metadata=metadata
             )
+
+            if trace:
+                self.delivery_metrics.record(message_id, trace, time.time())
             
             logger.info(f"Successfully uploaded message {message_id} to S3: s3://{self.s3_bucket}/{s3_key}")
             return True
@@ -156,51 +681,70 @@ class EmailProcessor:
             logger.error(f"Unexpected error uploading message {message_id} to S3: {str(e)}")
             return False
     
-    def _process_message(self, message: Dict) -> bool:
-        """Process a single SQS message"""
-        try:
-            message_id = message['MessageId']
-            receipt_handle = message['ReceiptHandle']
-            
-            logger.debug(f"Processing message {message_id}")
-            
-            # Parse message body
-            try:
-                message_body = json.loads(message['Body'])
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON in message {message_id}: {str(e)}")
-                return False
-            
-            # Validate message structure
-            if not isinstance(message_body, dict):
-                logger.error(f"Message {message_id} body is not a valid object")
-                return False
-            
-            # Upload to S3
-            if self._upload_to_s3(message_body, message_id):
-                # Delete message from SQS after successful upload
-                self.sqs_client.delete_message(
-                    QueueUrl=self.queue_url,
-                    ReceiptHandle=receipt_handle
-                )
-                logger.info(f"Successfully processed and deleted message {message_id}")
-                return True
-            else:
-                logger.error(f"Failed to upload message {message_id}, leaving in queue")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error processing message: {str(e)}", exc_info=True)
-            return False
+    def _acknowledge(self, items: List[PipelineItem]) -> int:
+        """Delete processed messages from SQS in batches of 10, returning how many were deleted"""
+        deleted = 0
+        by_queue = {}
+        for item in items:
+            by_queue.setdefault(item.queue_url, []).append(item)
+
+        for queue_url, queue_items in by_queue.items():
+            for offset in range(0, len(queue_items), 10):
+                chunk = queue_items[offset:offset + 10]
+                try:
+                    response = self.sqs_client.delete_message_batch(
+                        QueueUrl=queue_url,
+                        Entries=[
+                            {'Id': str(index), 'ReceiptHandle': item.receipt_handle}
+                            for index, item in enumerate(chunk)
+                        ]
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to delete {len(chunk)} processed messages from SQS: {str(e)}")
+                    for item in chunk:
+                        item.fail('delete_failed')
+                    continue
+
+                for failure in response.get('Failed', []):
+                    item = chunk[int(failure['Id'])]
+                    logger.error(f"Failed to delete message {item.message_id} ({failure.get('Code')}): {failure.get('Message')}")
+                    item.fail('delete_failed')
+                for item in chunk:
+                    if item.error is None:
+                        deleted += 1
+                        logger.info(f"Successfully processed and deleted message {item.message_id}")
+        return deleted
     
-    def _poll_messages(self) -> List[Dict]:
+    def _process_batch(self, messages: List[Dict], queue_url: Optional[str] = None,
+                       received_at: Optional[float] = None) -> Tuple[int, int]:
+        """Run a batch of polled messages through the pipeline, returning (successful, errors)"""
+        if received_at is None:
+            received_at = time.time()
+        queue_url = queue_url or self.queue_url
+
+        items = []
+        for message in messages:
+            try:
+                items.append(PipelineItem(message, queue_url, self._extract_trace(message, received_at)))
+            except KeyError as e:
+                logger.error(f"Error processing message: missing {str(e)}")
+
+        completed = self.pipeline.run(items)
+        if not self.pipeline.acknowledges:
+            logger.warning(f"Pipeline has no durable sink, leaving {len(completed)} messages in the queue")
+            return 0, len(messages)
+        batch_success = self._acknowledge(completed)
+        return batch_success, len(messages) - batch_success
+
+    def _poll_messages(self, queue_url: Optional[str] = None, wait_time_seconds: int = 20) -> List[Dict]:
         """Poll messages from SQS"""
         try:
             response = self.sqs_client.receive_message(
-                QueueUrl=self.queue_url,
+                QueueUrl=queue_url or self.queue_url,
                 MaxNumberOfMessages=self.max_messages,
-                WaitTimeSeconds=20,  
+                WaitTimeSeconds=wait_time_seconds,
                 VisibilityTimeout=self.visibility_timeout,
+                AttributeNames=['SentTimestamp'],
                 MessageAttributeNames=['All']
             )
             
@@ -220,6 +764,52 @@ class EmailProcessor:
             logger.error(f"Unexpected error polling SQS: {str(e)}")
             return []
     
+    def _assigned_queue_urls(self) -> List[str]:
+        """Queues this replica should consume from"""
+        if self.shard_coordinator:
+            return self.shard_coordinator.refresh()
+        return [self.queue_url]
+
+    def _poll_cycle(self) -> List[Tuple[str, List[Dict], float]]:
+        """Poll every assigned queue once, returning (queue_url, messages, received_at) for non-empty queues
+
+        received_at is taken when each poll returns, so time spent processing
+        earlier batches counts as batch wait rather than queue dwell.
+        """
+        queue_urls = self._assigned_queue_urls()
+        # Long poll a single queue; with several, a 20s wait on an idle shard would
+        # stall the rest, so give each a short long poll and let run() sleep when
+        # all are empty
+        wait_time_seconds = 20 if len(queue_urls) == 1 else self.shard_poll_wait
+
+        batches = []
+        for queue_url in queue_urls:
+            if not self.running:
+                break
+            messages = self._poll_messages(queue_url, wait_time_seconds)
+            if messages:
+                batches.append((queue_url, messages, time.time()))
+        return batches
+
+    def _collect_shard_depths(self) -> Dict[str, Dict[str, int]]:
+        """Fetch the backlog of each assigned queue"""
+        depths = {}
+        for queue_url in self._assigned_queue_urls():
+            try:
+                response = self.sqs_client.get_queue_attributes(
+                    QueueUrl=queue_url,
+                    AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+                )
+                attributes = response.get('Attributes', {})
+                depths[queue_url.rsplit('/', 1)[-1]] = {
+                    'visible': int(attributes.get('ApproximateNumberOfMessages', 0)),
+                    'in_flight': int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0))
+                }
+            except Exception as e:
+                logger.error(f"Failed to get queue depth for {queue_url}: {str(e)}")
+        self.shard_depths = depths
+        return depths
+
     def _health_check(self) -> bool:
         """Perform health check on AWS services"""
         try:
@@ -237,6 +827,15 @@ class EmailProcessor:
             logger.error(f"Health check failed: {str(e)}")
             return False
     
+    def _log_delivery_metrics(self):
+        """Log the delivery latency distribution per pipeline stage"""
+        summary = self.delivery_metrics.summary()
+        logger.info(f"Delivery latency metrics: {json.dumps(summary, sort_keys=True)}")
+        logger.info(f"Pipeline stage timings: {json.dumps(self.pipeline.summary(), sort_keys=True)}")
+        if self.shard_coordinator:
+            depths = self._collect_shard_depths()
+            logger.info(f"Shard queue depths: {json.dumps(depths, sort_keys=True)}")
+
     def run(self):
         """Main processing loop"""
         logger.info("Starting Email Processor service...")
@@ -246,37 +845,36 @@ class EmailProcessor:
         if not self._health_check():
             logger.error("Initial health check failed, exiting...")
             return
+
+        if self.shard_coordinator:
+            self.shard_coordinator.start()
         
         processed_count = 0
         error_count = 0
+        last_metrics_log = time.monotonic()
         
         while self.running:
             try:
                 # Poll for messages
-                messages = self._poll_messages()
+                batches = self._poll_cycle()
                 
-                if not messages:
+                if not batches:
                     # No messages, wait before next poll
                     time.sleep(self.poll_interval)
                     continue
                 
                 # Process messages
-                batch_success = 0
-                batch_errors = 0
-                
-                for message in messages:
-                    if not self.running:
-                        break
-                    
-                    if self._process_message(message):
-                        batch_success += 1
-                        processed_count += 1
-                    else:
-                        batch_errors += 1
-                        error_count += 1
-                
-                logger.info(f"Batch processed: {batch_success} successful, {batch_errors} errors")
+                for queue_url, messages, received_at in batches:
+                    batch_success, batch_errors = self._process_batch(messages, queue_url, received_at)
+                    processed_count += batch_success
+                    error_count += batch_errors
+
+                    logger.info(f"Batch processed: {batch_success} successful, {batch_errors} errors")
                 logger.info(f"Total processed: {processed_count}, Total errors: {error_count}")
+
+                if time.monotonic() - last_metrics_log >= self.metrics_log_interval:
+                    self._log_delivery_metrics()
+                    last_metrics_log = time.monotonic()
                 
                 # Brief pause between batches
                 if self.running:
@@ -290,6 +888,9 @@ class EmailProcessor:
                 error_count += 1
                 time.sleep(10)  # Wait before retrying
         
+        self._log_delivery_metrics()
+        if self.shard_coordinator:
+            self.shard_coordinator.leave()
         logger.info(f"Email Processor stopped. Final stats: {processed_count} processed, {error_count} errors")
 
 
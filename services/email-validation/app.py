@@ -5,18 +5,21 @@ import sys
 from datetime import datetime
 import json
 import os
+import time
+import zlib
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 
 app = Flask(__name__)
 
 # Configure logging
-log_dir = '/app/logs'
+log_dir = os.getenv('LOG_DIR', '/app/logs')
 os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, 'api.log')
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler(log_file),
@@ -27,19 +30,58 @@ logger = logging.getLogger(__name__)
 
 # AWS clients
 AWS_REGION = os.getenv('AWS_REGION', 'us-west-2')
-try:
-    ssm_client = boto3.client('ssm', region_name=AWS_REGION)
-    sqs_client = boto3.client('sqs', region_name=AWS_REGION)
-    logger.info(f"AWS clients initialized successfully for region: {AWS_REGION}")
-except NoCredentialsError:
-    logger.error("AWS credentials not found")
+# gunicorn.conf.py sizes the connection pool to the worker's thread count
+AWS_CLIENT_CONFIG = Config(
+    max_pool_connections=int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '10')),
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+# Clients belong to the process that created them. Under a preforking server
+# each worker calls init_aws_clients() again after fork so workers never
+# share connection pools with the master or each other.
+ssm_client = None
+sqs_client = None
+_aws_clients_pid = None
+
+def init_aws_clients():
+    """Create the AWS clients for the current process"""
+    global ssm_client, sqs_client, _aws_clients_pid
+    try:
+        ssm_client = boto3.client('ssm', region_name=AWS_REGION, config=AWS_CLIENT_CONFIG)
+        sqs_client = boto3.client('sqs', region_name=AWS_REGION, config=AWS_CLIENT_CONFIG)
+        logger.info(f"AWS clients initialized successfully for region: {AWS_REGION}")
+    except NoCredentialsError:
+        logger.error("AWS credentials not found")
+        ssm_client = None
+        sqs_client = None
+    _aws_clients_pid = os.getpid()
+
+def ensure_aws_clients():
+    """Recreate the AWS clients if this process was forked after they were created"""
+    if _aws_clients_pid != os.getpid():
+        init_aws_clients()
+
+def close_aws_clients():
+    """Close this process's AWS connection pools"""
+    global ssm_client, sqs_client, _aws_clients_pid
+    for client in (ssm_client, sqs_client):
+        if client is not None:
+            client.close()
     ssm_client = None
     sqs_client = None
+    _aws_clients_pid = None
+
+init_aws_clients()
 
 # Environment variables
 SSM_PARAMETER_NAME = os.getenv('SSM_PARAMETER_NAME', '/email-service/auth-token')
 SQS_QUEUE_URL_PARAMETER = os.getenv('SQS_QUEUE_URL_PARAMETER', '/email-service/sqs-queue-url')
+# Optional: when set, messages are routed to sender-sharded queues listed in this parameter
+SQS_SHARD_URLS_PARAMETER = os.getenv('SQS_SHARD_URLS_PARAMETER', '')
 
+# Configuration lookups run once at import; with gunicorn's preload_app that
+# is once in the master, and the workers inherit the results
 # Get SQS Queue URL from SSM
 SQS_QUEUE_URL = None
 if ssm_client:
@@ -52,13 +94,26 @@ if ssm_client:
     except Exception as e:
         logger.error(f"Unexpected error retrieving SQS Queue URL from SSM: {str(e)}")
 
+# Get sender-sharded queue URLs from SSM (comma separated, ordered by shard index)
+SQS_SHARD_URLS = []
+if ssm_client and SQS_SHARD_URLS_PARAMETER:
+    try:
+        response = ssm_client.get_parameter(Name=SQS_SHARD_URLS_PARAMETER)
+        SQS_SHARD_URLS = [url.strip() for url in response['Parameter']['Value'].split(',') if url.strip()]
+        logger.info(f"Sharded mode enabled with {len(SQS_SHARD_URLS)} queues from SSM parameter: {SQS_SHARD_URLS_PARAMETER}")
+    except ClientError as e:
+        logger.error(f"Failed to retrieve SQS shard URLs from SSM parameter {SQS_SHARD_URLS_PARAMETER}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error retrieving SQS shard URLs from SSM: {str(e)}")
+
 if not SSM_PARAMETER_NAME:
     logger.error("SSM_PARAMETER_NAME environment variable not set")
-if not SQS_QUEUE_URL:
+if not SQS_QUEUE_URL and not SQS_SHARD_URLS:
     logger.error("SQS_QUEUE_URL could not be retrieved from SSM parameter")
 
 def validate_token(provided_token, request_id):
     """Validate token against SSM parameter store"""
+    ensure_aws_clients()
     if not ssm_client or not SSM_PARAMETER_NAME:
         logger.error(f"[{request_id}] SSM client or parameter name not configured")
         return False
@@ -83,18 +138,38 @@ def validate_token(provided_token, request_id):
         logger.error(f"[{request_id}] Unexpected error during token validation: {str(e)}")
         return False
 
-def publish_to_sqs(data, request_id):
-    """Publish validated data to SQS queue"""
-    if not sqs_client or not SQS_QUEUE_URL:
+def shard_for_sender(email_sender, shard_count):
+    """Map a sender to a shard index; stable across processes and restarts"""
+    return zlib.crc32(email_sender.encode('utf-8')) % shard_count
+
+def queue_url_for(data):
+    """Pick the destination queue, routing by sender when sharded mode is enabled"""
+    if SQS_SHARD_URLS:
+        return SQS_SHARD_URLS[shard_for_sender(data.get('email_sender', 'unknown'), len(SQS_SHARD_URLS))]
+    return SQS_QUEUE_URL
+
+def publish_to_sqs(data, request_id, received_at=None):
+    """Publish validated data to SQS queue
+
+    received_at is the epoch time the API received the request; it travels
+    with the message as the ingested_at attribute so the processor can measure
+    end-to-end delivery latency.
+    """
+    ensure_aws_clients()
+    queue_url = queue_url_for(data)
+    if not sqs_client or not queue_url:
         logger.error(f"[{request_id}] SQS client or queue URL not configured")
         return False
     
+    if received_at is None:
+        received_at = time.time()
+
     try:
         message_body = json.dumps(data)
-        logger.debug(f"[{request_id}] Publishing message to SQS: {SQS_QUEUE_URL}")
+        logger.debug(f"[{request_id}] Publishing message to SQS: {queue_url}")
         
         response = sqs_client.send_message(
-            QueueUrl=SQS_QUEUE_URL,
+            QueueUrl=queue_url,
             MessageBody=message_body,
             MessageAttributes={
                 'request_id': {
@@ -108,6 +183,10 @@ def publish_to_sqs(data, request_id):
                 'timestamp': {
                     'StringValue': datetime.now().isoformat(),
                     'DataType': 'String'
+                },
+                'ingested_at': {
+                    'StringValue': str(int(received_at * 1000)),
+                    'DataType': 'Number'
                 }
             }
         )
@@ -136,6 +215,7 @@ class RequestSchema(Schema):
 
 @app.route('/validate-email', methods=['POST'])
 def validate_email():
+    received_at = time.time()
     request_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
     client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
     
@@ -190,7 +270,7 @@ def validate_email():
         
         # Publish data to SQS
         logger.debug(f"[{request_id}] Publishing data to SQS")
-        if not publish_to_sqs(result['data'], request_id):
+        if not publish_to_sqs(result['data'], request_id, received_at):
             logger.error(f"[{request_id}] Failed to publish message to SQS")
             return jsonify({
                 'error': 'Failed to process message',
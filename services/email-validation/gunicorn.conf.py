@@ -0,0 +1,113 @@
+"""Gunicorn runtime profile for the email validation API
+
+Every setting can be overridden through the GUNICORN_* environment variables
+below. Defaults:
+- gthread workers, one per CPU allowed by the container CPU limit (without
+  a limit, every CPU on the node), each with GUNICORN_THREADS threads, since
+  requests mostly wait on SSM/SQS
+- preload_app so the code and the SSM configuration lookups happen once in
+  the master and are shared copy-on-write; AWS clients are recreated in each
+  worker after fork
+- keep-alive longer than the ALB idle timeout (60s) so the load balancer,
+  not gunicorn, closes idle connections
+- no worker recycling: with gunicorn 21.2 a worker restarted by
+  max_requests drops requests that are already queued on its socket, which
+  the ALB returns as 502s. Set GUNICORN_MAX_REQUESTS (plus jitter) only to
+  contain a memory leak
+"""
+import json
+import math
+import os
+import time
+
+_BOOT_STARTED = time.monotonic()
+
+
+def _available_cpus():
+    """CPUs this container may use: the cgroup quota if set, else the affinity mask"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as fh:  # cgroup v2
+            quota, period = fh.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as fh:  # cgroup v1
+            quota = int(fh.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as fh:
+            period = int(fh.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+# Async workers such as gevent are not installed in the image
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', str(_available_cpus())))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '75'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+# Worker heartbeat files go to memory rather than the container's /tmp volume
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# One pooled connection per concurrent request in a worker; read by app.py at import
+os.environ.setdefault('AWS_MAX_POOL_CONNECTIONS', str(threads))
+
+
+def _emit(server, event, **fields):
+    server.log.info(f"{event} {json.dumps(fields, sort_keys=True)}")
+
+
+def _app_module():
+    import app
+    return app
+
+
+def when_ready(server):
+    """Master is listening; with preload the app (and its SSM lookups) is already loaded"""
+    if preload_app:
+        # Drop the master's connection pools so no sockets are inherited by workers
+        _app_module().close_aws_clients()
+    _emit(server, 'gunicorn_master_ready',
+          boot_ms=round((time.monotonic() - _BOOT_STARTED) * 1000, 1),
+          worker_class=worker_class, workers=workers, threads=threads,
+          preload_app=preload_app, keepalive=keepalive,
+          aws_max_pool_connections=int(os.environ['AWS_MAX_POOL_CONNECTIONS']))
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.monotonic()
+    if preload_app:
+        started = time.monotonic()
+        _app_module().init_aws_clients()
+        worker.aws_init_ms = round((time.monotonic() - started) * 1000, 1)
+    else:
+        worker.aws_init_ms = None
+
+
+def post_worker_init(worker):
+    _emit(worker, 'gunicorn_worker_booted',
+          pid=worker.pid,
+          boot_ms=round((time.monotonic() - worker.boot_started) * 1000, 1),
+          aws_client_init_ms=worker.aws_init_ms)
+
+
+def worker_exit(server, worker):
+    _emit(server, 'gunicorn_worker_exit',
+          pid=worker.pid,
+          uptime_s=round(time.monotonic() - getattr(worker, 'boot_started', _BOOT_STARTED), 1),
+          requests=getattr(worker, 'nr', None))
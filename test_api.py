@@ -4,7 +4,7 @@ import os
 
 # Test the API with valid payload
 def test_valid_payload():
-    url = "http://localhost:8080/validate"
+    url = "http://localhost:8080/validate-email"
     
     valid_payload = {
         "data": {
@@ -22,7 +22,7 @@ def test_valid_payload():
 
 # Test with invalid payload (missing field)
 def test_invalid_payload():
-    url = "http://localhost:8080/validate"
+    url = "http://localhost:8080/validate-email"
     
     invalid_payload = {
         "data": {
@@ -46,7 +46,7 @@ if __name__ == "__main__":
 
 # Test with invalid token
 def test_invalid_token():
-    url = "http://localhost:8080/validate"
+    url = "http://localhost:8080/validate-email"
     
     invalid_token_payload = {
         "data": {
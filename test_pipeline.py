@@ -0,0 +1,211 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import boto3
+import pytest
+
+# Run the processor against the in-process AWS fakes used by the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import harness  # noqa: E402
+
+SPECS = ['parse,normalize,s3', 'parse,size_stats,s3', 'parse,normalize,size_stats,s3', 'parse,validate,normalize,s3']
+NON_OBJECT_BODIES = ['[1]', '"text"', 'null']
+POISON_CASES = [(spec, body) for spec in SPECS for body in NON_OBJECT_BODIES] + [
+    ('parse,size_stats,s3', json.dumps({'email_sender': 'bad@example.com', 'email_content': 42})),
+]
+
+
+def _load_processor_app(monkeypatch, latency=None, shards=0):
+    """Fake AWS and the processor module loaded against it"""
+    # Let monkeypatch restore the environment and boto3.client that the harness overrides
+    for name in ('LOG_DIR', 'LOG_LEVEL', 'AWS_REGION', 'SSM_PARAMETER_NAME', 'SQS_QUEUE_URL_PARAMETER',
+                 'S3_BUCKET_NAME_PARAMETER', 'SQS_SHARD_URLS_PARAMETER', 'PROCESSOR_PIPELINE'):
+        monkeypatch.delenv(name, raising=False)
+    harness.configure_environment('ERROR', shards)
+    aws = harness.build_fake_aws(latency or {}, shards)
+    monkeypatch.setattr(boto3, 'client', aws.client)
+    return aws, harness.load_service('email-processor', aws)
+
+
+@pytest.fixture
+def processor_env(monkeypatch):
+    """Fake AWS, the processor module loaded against it, and the shared queue URL"""
+    aws, processor_app = _load_processor_app(monkeypatch)
+    return aws, processor_app, aws.parameters[harness.SQS_QUEUE_URL_PARAMETER], monkeypatch
+
+
+def _archived(aws):
+    return [key for key in aws.buckets[harness.BUCKET_NAME] if key.startswith('emails/')]
+
+
+@pytest.mark.parametrize('spec,poison', POISON_CASES)
+def test_poison_message_does_not_fail_the_batch(processor_env, spec, poison):
+    aws, processor_app, queue_url, monkeypatch = processor_env
+    monkeypatch.setenv('PROCESSOR_PIPELINE', spec)
+    processor = processor_app.EmailProcessor()
+
+    sqs = aws.client('sqs')
+    sqs.send_message(QueueUrl=queue_url, MessageBody=poison)
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({
+        'email_subject': ' Hello ',
+        'email_sender': 'good@example.com',
+        'email_timestream': '1693561101',
+        'email_content': 'Body'
+    }))
+
+    messages = processor._poll_messages(queue_url, 0)
+    assert len(messages) == 2
+    assert processor._process_batch(messages, queue_url) == (1, 1)
+
+    # The good message is archived and deleted; the poison one stays in flight for redelivery
+    assert len(_archived(aws)) == 1
+    in_flight = [message['Body'] for _, message in aws.queues[queue_url].in_flight.values()]
+    assert in_flight == [poison]
+
+
+def test_pipeline_without_durable_sink_is_rejected(processor_env):
+    _, processor_app, _, monkeypatch = processor_env
+    for spec in ('parse,validate,log', 'parse,validate', 'validate,parse,s3'):
+        monkeypatch.setenv('PROCESSOR_PIPELINE', spec)
+        with pytest.raises(ValueError):
+            processor_app.EmailProcessor()
+
+
+def test_stage_without_process_cannot_be_created(processor_env):
+    _, processor_app, _, _ = processor_env
+
+    class IncompleteStage(processor_app.PipelineStage):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        IncompleteStage(None)
+
+
+def test_received_at_is_taken_per_polled_queue(monkeypatch):
+    s3_latency = 0.05
+    aws, processor_app = _load_processor_app(monkeypatch, {'s3': s3_latency}, shards=2)
+    monkeypatch.setenv('POD_NAME', 'processor-0')
+    processor = processor_app.EmailProcessor()
+    # Heartbeat up front so the membership round trips don't count as queue dwell
+    processor.shard_coordinator.refresh(force=True)
+
+    sqs = aws.client('sqs')
+    for queue_url in aws.parameters[harness.SQS_SHARD_URLS_PARAMETER].split(','):
+        sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({'email_sender': 'a@example.com'}))
+
+    batches = processor._poll_cycle()
+    assert len(batches) == 2
+    for queue_url, messages, received_at in batches:
+        processor._process_batch(messages, queue_url, received_at)
+
+    # The second batch waited for the first batch's upload after its poll returned;
+    # that wait belongs to batch_wait, not queue_dwell
+    summary = processor.delivery_metrics.summary()
+    assert summary['queue_dwell']['max_ms'] < s3_latency * 1000
+    assert summary['batch_wait']['max_ms'] >= s3_latency * 1000
+
+
+EMAIL_WITH_SPECIAL_CHARACTERS = {
+    'email_subject': 'Grüße — "quoted" \\ back\\slash',
+    'email_sender': 'zoë@example.com',
+    'email_timestream': '1693561101',
+    'email_content': 'line one\nline two\ttabbed \U0001F600 </script>'
+}
+
+
+@pytest.mark.parametrize('raw_body', [
+    json.dumps(EMAIL_WITH_SPECIAL_CHARACTERS),
+    json.dumps(EMAIL_WITH_SPECIAL_CHARACTERS, ensure_ascii=False),
+    None,
+])
+def test_compact_archive_matches_pretty(processor_env, raw_body):
+    _, processor_app, _, _ = processor_env
+    email_data = json.loads(raw_body) if raw_body is not None else dict(EMAIL_WITH_SPECIAL_CHARACTERS)
+    record = processor_app.ArchiveRecord('message-1', '2024-01-01T00:00:00+00:00', email_data, raw_body)
+
+    compact = processor_app.CompactArchiveSerializer()
+    # A longer record first, so leftovers in the reused buffer would corrupt the output
+    compact.serialize(processor_app.ArchiveRecord('message-0', '2024-01-01T00:00:00+00:00', {'email_content': 'x' * 4096}))
+    expected = json.loads(processor_app.PrettyArchiveSerializer().serialize(record))
+    assert json.loads(compact.serialize(record)) == expected
+    assert expected['email_data'] == EMAIL_WITH_SPECIAL_CHARACTERS
+
+
+def test_mutating_stage_archives_changed_body(processor_env):
+    aws, processor_app, queue_url, monkeypatch = processor_env
+    monkeypatch.setenv('PROCESSOR_PIPELINE', 'parse,normalize,s3')
+    processor = processor_app.EmailProcessor()
+
+    sqs = aws.client('sqs')
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({
+        'email_subject': '  Padded subject  ',
+        'email_sender': 'a@example.com',
+        'email_timestream': '1693561101',
+        'email_content': 'Body'
+    }))
+    messages = processor._poll_messages(queue_url, 0)
+    assert processor._process_batch(messages, queue_url) == (1, 0)
+
+    [key] = _archived(aws)
+    archived = json.loads(aws.buckets[harness.BUCKET_NAME][key]['Body'])
+    assert archived['email_data']['email_subject'] == 'Padded subject'
+
+
+def test_trace_attributes_reach_archive_metadata_and_metrics(processor_env):
+    aws, processor_app, queue_url, _ = processor_env
+    processor = processor_app.EmailProcessor()
+
+    ingested_at_ms = int(time.time() * 1000) - 250
+    aws.client('sqs').send_message(
+        QueueUrl=queue_url,
+        MessageBody=json.dumps({'email_sender': 'a@example.com', 'email_content': 'Body'}),
+        MessageAttributes={
+            'request_id': {'StringValue': 'req-123', 'DataType': 'String'},
+            'ingested_at': {'StringValue': str(ingested_at_ms), 'DataType': 'Number'}
+        }
+    )
+    messages = processor._poll_messages(queue_url, 0)
+    assert processor._process_batch(messages, queue_url) == (1, 0)
+
+    [key] = _archived(aws)
+    metadata = aws.buckets[harness.BUCKET_NAME][key]['Metadata']
+    assert metadata['request-id'] == 'req-123'
+    assert metadata['ingested-at'] == datetime.fromtimestamp(ingested_at_ms / 1000.0, timezone.utc).isoformat()
+
+    summary = processor.delivery_metrics.summary()
+    for stage in processor_app.DeliveryMetrics.STAGES:
+        assert summary[stage]['count'] == 1, stage
+    assert summary['end_to_end']['max_ms'] >= 250
+
+
+def test_shard_heartbeat_continues_while_main_loop_is_busy(processor_env):
+    aws, processor_app, _, _ = processor_env
+    s3 = aws.client('s3')
+    queue_urls = [f"queue-{index}" for index in range(8)]
+
+    def coordinator(member_id):
+        return processor_app.ShardCoordinator(s3, harness.BUCKET_NAME, queue_urls, member_id,
+                                              heartbeat_interval=0.1, member_ttl=0.3)
+
+    busy = coordinator('busy')
+    busy.start()
+    try:
+        # Longer than the TTL without the owner calling refresh() itself
+        time.sleep(0.6)
+        observer = coordinator('observer')
+        assert observer.refresh(force=True) != queue_urls
+        assert observer.members == ['busy', 'observer']
+    finally:
+        busy.leave()
+    assert observer.refresh(force=True) == queue_urls
+
+
+def test_shard_member_ttl_must_exceed_heartbeat_interval(processor_env):
+    aws, processor_app, _, _ = processor_env
+    with pytest.raises(ValueError):
+        processor_app.ShardCoordinator(aws.client('s3'), harness.BUCKET_NAME, ['queue-0'], 'member',
+                                       heartbeat_interval=30, member_ttl=30)